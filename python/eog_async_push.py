@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+asyncio multi-device EOG pusher (several Arduino UNO + AD8232 boards).
+
+Same wire format and endpoint as eog_http_push.py, but one process reads N
+serial ports concurrently:
+  - each device keeps its own millis -> epoch alignment
+  - every POST carries a "device" id next to "aref" / "samples"
+  - all devices share one HTTP client with bounded concurrency (--concurrency)
+  - per-device throughput and timestamp jitter stats are printed every
+    --stats-interval seconds
+  - ports are rescanned every --scan-interval seconds: boards that appear are
+    picked up, boards that disappear are dropped and re-opened when they return
+    (auto-detected boards are identified by USB serial number / location, so a
+    board keeps its id when it re-enumerates on another port)
+
+Usage:
+  # all detected boards, hot-plug aware
+  python eog_async_push.py --server http://localhost:3000 --token YOUR_TOKEN
+  # explicit ports with ids (PORT[=ID], repeatable)
+  python eog_async_push.py --port /dev/ttyACM0=left --port /dev/ttyACM1=right
+
+Serial reads and POSTs run in worker threads (pyserial and urllib are
+blocking), so there are no dependencies beyond eog_http_push.py.
+"""
+from __future__ import annotations
+import argparse, asyncio, math, os, re, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import serial
+from serial.tools import list_ports
+from eog_http_push import detect_ports, parse_line, post_json
+from eog_shm import EogShmWriter, DEFAULT_CAPACITY
+
+RESET_WAIT = 1.2  # seconds for the Arduino auto reset after opening the port
+
+class HttpClient:
+    """Shared POST client: at most `concurrency` requests in flight."""
+
+    def __init__(self, server: str, token: str = '', concurrency: int = 4):
+        self.url = server.rstrip('/') + '/api/eog/push'
+        self.token = token
+        self.sem = asyncio.Semaphore(concurrency)
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='eog-http')
+        self.inflight: set[asyncio.Future] = set()
+
+    async def submit(self, body: Dict[str, Any], device: 'Device') -> None:
+        """Start a POST; waits only while all slots are busy (backpressure)."""
+        await self.sem.acquire()
+        fut = asyncio.get_running_loop().run_in_executor(self.pool, post_json, self.url, body, self.token)
+        self.inflight.add(fut)
+
+        def done(f: asyncio.Future) -> None:
+            self.inflight.discard(f)
+            self.sem.release()
+            if f.exception() is not None:
+                device.stats.post_errors += 1
+                print(f'[{device.id}] POST error:', f.exception())
+            else:
+                device.stats.batches += 1
+        fut.add_done_callback(done)
+
+    async def close(self) -> None:
+        if self.inflight:
+            await asyncio.wait(self.inflight, timeout=5)
+        self.pool.shutdown(wait=False)
+
+class DeviceStats:
+    """Per-device counters; the window part is reset on every report."""
+
+    def __init__(self):
+        self.samples = 0
+        self.batches = 0
+        self.post_errors = 0
+        self.parse_errors = 0
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self.t0 = time.time()
+        self.n = 0
+        self.last_ms: Optional[int] = None
+        self.dt = [0, 0.0, 0.0]   # count, sum, sum of squares of device-millis intervals
+        self.lag = [0, 0.0, 0.0]  # same for host arrival - aligned epoch_ms
+
+    @staticmethod
+    def _add(acc: List[float], v: float) -> None:
+        acc[0] += 1; acc[1] += v; acc[2] += v * v
+
+    @staticmethod
+    def _mean_std(acc: List[float]) -> tuple[float, float]:
+        if not acc[0]:
+            return float('nan'), float('nan')
+        mean = acc[1] / acc[0]
+        return mean, math.sqrt(max(0.0, acc[2] / acc[0] - mean * mean))
+
+    def new_session(self) -> None:
+        """Board reconnected or reset: don't measure intervals across sessions."""
+        self.last_ms = None
+
+    def add(self, ms: int, epoch_ms: int, now_ms: int) -> None:
+        self.samples += 1
+        self.n += 1
+        if self.last_ms is not None:
+            self._add(self.dt, ms - self.last_ms)
+        self.last_ms = ms
+        self._add(self.lag, now_ms - epoch_ms)
+
+    def snapshot(self, reset: bool = True) -> Dict[str, Any]:
+        """Throughput and jitter over the current window.
+
+        interval_* : spacing of device millis (sampling jitter on the board)
+        lag_*      : host arrival minus aligned timestamp (serial/USB jitter;
+                     a drifting mean means the board clock runs fast/slow)
+        """
+        elapsed = max(1e-6, time.time() - self.t0)
+        dt_mean, dt_std = self._mean_std(self.dt)
+        lag_mean, lag_std = self._mean_std(self.lag)
+        snap = {
+            'rate_hz': self.n / elapsed,
+            'interval_ms': dt_mean, 'interval_std_ms': dt_std,
+            'lag_ms': lag_mean, 'lag_std_ms': lag_std,
+            'samples': self.samples, 'batches': self.batches,
+            'post_errors': self.post_errors, 'parse_errors': self.parse_errors,
+        }
+        if reset:
+            last_ms = self.last_ms
+            self._reset_window()
+            self.last_ms = last_ms
+        return snap
+
+class Device:
+    """One serial board: reads lines, aligns timestamps, batches POSTs."""
+
+    def __init__(self, port: str, device_id: str, args: argparse.Namespace, http: Optional[HttpClient]):
+        self.port = port
+        self.id = device_id
+        self.args = args
+        self.http = http
+        self.stats = DeviceStats()
+        # One ring per board for the whole run, so local readers survive reconnects
+        self.shm = EogShmWriter(f'{args.shm}_{device_id}', capacity=args.shm_capacity, aref=args.aref) if args.shm else None
+        # Blocking readline gets its own thread so a slow board never stalls others
+        self.reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'eog-{device_id}')
+
+    async def run(self) -> None:
+        args = self.args
+        loop = asyncio.get_running_loop()
+        port = self.port
+        ser = await loop.run_in_executor(self.reader, lambda: serial.Serial(port, args.baud, timeout=0.1))
+        shm = self.shm
+        self.stats.new_session()
+        try:
+            await asyncio.sleep(RESET_WAIT)
+            # Drop lines queued during the wait so they don't skew the millis alignment
+            await loop.run_in_executor(self.reader, ser.reset_input_buffer)
+            print(f'[{self.id}] reading {self.port} @ {args.baud} baud')
+            buf: List[Dict[str, Any]] = []
+            ms0 = None  # first seen device millis (per device)
+            epoch0 = None  # wall-clock epoch (ms) aligned to ms0
+            last_post = time.time()
+            while True:
+                try:
+                    line = await loop.run_in_executor(self.reader, ser.readline)
+                except serial.SerialException:
+                    # Board unplugged: still deliver what was already read
+                    if buf:
+                        await self.http.submit({ 'aref': args.aref, 'device': self.id, 'samples': buf }, self)
+                    raise
+                if line:
+                    parsed = parse_line(line)
+                    if parsed is None:
+                        self.stats.parse_errors += 1
+                    else:
+                        ms, raw, lop, lon = parsed
+                        now_ms = int(time.time() * 1000)
+                        if ms0 is None or ms < ms0:
+                            # First sample, or board reset (millis went backwards): re-anchor
+                            ms0, epoch0 = ms, now_ms
+                            self.stats.new_session()
+                        epoch_ms = epoch0 + (ms - ms0)
+                        self.stats.add(ms, epoch_ms, now_ms)
+                        if shm is not None:
+                            shm.write([(epoch_ms, raw, lop, lon)])
+                        if self.http is not None:
+                            buf.append({ 'epoch_ms': epoch_ms, 'raw': raw, 'lop': lop, 'lon': lon })
+                if buf and (len(buf) >= args.batch or (time.time() - last_post) > 0.25):
+                    await self.http.submit({ 'aref': args.aref, 'device': self.id, 'samples': buf }, self)
+                    buf = []
+                    last_post = time.time()
+        finally:
+            try: ser.close()
+            except Exception: pass
+
+    def close(self) -> None:
+        self.reader.shutdown(wait=False)
+        if self.shm is not None:
+            self.shm.close()
+
+def clean_id(dev_id: str) -> str:
+    """Make an id safe for payloads and shared-memory names."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', dev_id)
+
+def parse_port_spec(spec: str) -> tuple[str, str]:
+    """'PORT[=ID]' -> (port, id); id defaults to the port's basename."""
+    port, _, dev_id = spec.partition('=')
+    return port, clean_id(dev_id or os.path.basename(port))
+
+def detect_boards() -> Dict[str, str]:
+    """Detected boards as {id: port}.
+
+    The id is the USB serial number (or USB location) when the OS reports one,
+    so it stays the same when a board re-enumerates on another port; the port
+    basename is the fallback. A serial number shared by several boards (cheap
+    clones) is never used alone: each of them gets its location or port
+    appended, so the ids don't depend on the order comports() lists them in.
+    """
+    found = set(detect_ports())
+    ports = sorted((p for p in list_ports.comports() if p.device in found), key=lambda p: p.device)
+    serials = [p.serial_number for p in ports if p.serial_number]
+    boards: Dict[str, str] = {}
+    for p in ports:
+        base = os.path.basename(p.device)
+        if p.serial_number and serials.count(p.serial_number) > 1:
+            dev_id = f'{p.serial_number}_{p.location or base}'
+        else:
+            dev_id = p.serial_number or p.location or base
+        boards[clean_id(dev_id)] = p.device
+    return boards
+
+async def run(args: argparse.Namespace, explicit: Dict[str, str]) -> None:
+    """Supervise one Device task per board. `explicit` maps id -> port (empty = auto-detect)."""
+    http = None if args.no_http else HttpClient(args.server, args.token, args.concurrency)
+    devices: Dict[str, Device] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    refused: set[str] = set()
+
+    def on_exit(dev_id: str, task: asyncio.Task) -> None:
+        if tasks.get(dev_id) is task:
+            del tasks[dev_id]
+        if not task.cancelled() and task.exception() is not None:
+            print(f'[{dev_id}] {devices[dev_id].port} gone: {task.exception()}')
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            for dev_id, dev in devices.items():
+                st = dev.stats.snapshot()
+                state = 'up' if dev_id in tasks else 'down'
+                print(f'[{dev_id}] {state} {st["rate_hz"]:.1f} Hz, interval {st["interval_ms"]:.2f}±{st["interval_std_ms"]:.2f} ms, '
+                      f'lag {st["lag_ms"]:.1f}±{st["lag_std_ms"]:.2f} ms, samples={st["samples"]} '
+                      f'batches={st["batches"]} post_err={st["post_errors"]} parse_err={st["parse_errors"]}')
+
+    reporter = asyncio.create_task(report()) if args.stats_interval > 0 else None
+    waiting_noted = False
+    try:
+        while True:
+            if explicit:
+                # Explicit ports are only (re)opened while they are plugged in
+                listed = {p.device for p in await asyncio.to_thread(list_ports.comports)}
+                wanted = {i: p for i, p in explicit.items() if p in listed or os.path.exists(p)}
+            else:
+                wanted = await asyncio.to_thread(detect_boards)
+            # Drop boards that vanished (or moved to another port) without a read error
+            for dev_id, task in list(tasks.items()):
+                if wanted.get(dev_id) != devices[dev_id].port:
+                    task.cancel()
+                    del tasks[dev_id]
+            for dev_id, port in wanted.items():
+                if dev_id in tasks or dev_id in refused:
+                    continue
+                dev = devices.get(dev_id)
+                if dev is None:
+                    try:
+                        dev = devices[dev_id] = Device(port, dev_id, args, http)
+                    except FileExistsError as e:
+                        # Shared-memory ring owned by another pusher instance
+                        print(f'[{dev_id}] skipped: {e}')
+                        refused.add(dev_id)
+                        continue
+                dev.port = port
+                task = asyncio.create_task(dev.run())
+                task.add_done_callback(lambda t, i=dev_id: on_exit(i, t))
+                tasks[dev_id] = task
+            if not devices and not refused and not waiting_noted:
+                print('No serial port found yet; waiting for a board (or use --port)')
+                waiting_noted = True
+            await asyncio.sleep(args.scan_interval)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        pending = list(tasks.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for dev in devices.values():
+            dev.close()
+        if http is not None:
+            await http.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--server', type=str, default='http://localhost:3000')
+    ap.add_argument('--port', type=str, action='append', default=[], help='PORT[=ID], repeatable; default: all detected boards')
+    ap.add_argument('--baud', type=int, default=115200)
+    ap.add_argument('--aref', type=float, default=3.3)
+    ap.add_argument('--batch', type=int, default=40, help='samples per POST')
+    ap.add_argument('--token', type=str, default='', help='API_AUTH_TOKEN if server requires it')
+    ap.add_argument('--concurrency', type=int, default=4, help='max POSTs in flight across all devices')
+    ap.add_argument('--scan-interval', type=float, default=2.0, help='seconds between port rescans (hot-plug)')
+    ap.add_argument('--stats-interval', type=float, default=10.0, help='seconds between stats lines (0 = off)')
+    ap.add_argument('--shm', type=str, default='', help='also write each device to shared memory PREFIX_<id>')
+    ap.add_argument('--shm-capacity', type=int, default=DEFAULT_CAPACITY, help='ring size in samples')
+    ap.add_argument('--no-http', action='store_true', help='do not POST to the server (use with --shm)')
+    args = ap.parse_args()
+    if args.no_http and not args.shm:
+        print('--no-http requires --shm')
+        sys.exit(2)
+    explicit: Dict[str, str] = {}
+    for spec in args.port:
+        port, dev_id = parse_port_spec(spec)
+        if dev_id in explicit:
+            ap.error(f'duplicate device id {dev_id!r} ({explicit[dev_id]} and {port})')
+        if port in explicit.values():
+            ap.error(f'port {port} given twice')
+        explicit[dev_id] = port
+    try:
+        asyncio.run(run(args, explicit))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark for the two EOG transports.
+
+  shm  : writer process -> shared-memory ring (eog_shm.py) -> reader (this process)
+  http : POST /api/eog/push -> Node server -> WebSocket "eog" -> this process
+
+Both paths send synthetic samples at --rate Hz in batches of --batch (shm
+writes per sample, like eog_http_push.py --shm). Each sample carries its send
+time in the epoch_ms field (time.time_ns() for shm, ms for HTTP), and latency
+is measured per sample from that stamp until the consumer sees it. The HTTP
+path needs a running server that implements /api/eog/push.
+
+Usage:
+  python eog_bench.py --path shm
+  python eog_bench.py --path both --server http://localhost:3000 --token YOUR_TOKEN
+
+HTTP path requires websocket-client (see requirements.txt).
+"""
+from __future__ import annotations
+import argparse, json, statistics, threading, time
+from multiprocessing import Event, Process
+from typing import List
+from urllib.parse import urlparse, urlunparse, urlencode
+
+from eog_shm import EogShmReader, EogShmWriter
+
+def summarize(name: str, lat_ms: List[float]) -> None:
+    if not lat_ms:
+        print(f'{name}: no samples received')
+        return
+    lat = sorted(lat_ms)
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))]
+    print(f'{name}: n={len(lat)} median={statistics.median(lat):.3f}ms '
+          f'p95={pct(0.95):.3f}ms p99={pct(0.99):.3f}ms max={lat[-1]:.3f}ms')
+
+def _shm_writer(name: str, rate: float, count: int, ready, done) -> None:
+    w = EogShmWriter(name, capacity=4096)
+    ready.set()
+    period = 1.0 / rate
+    t_next = time.perf_counter()
+    try:
+        for i in range(count):
+            t_next += period
+            time.sleep(max(0.0, t_next - time.perf_counter()))
+            # Send time in ns rides in the epoch_ms field (synthetic data)
+            w.write([(time.time_ns(), i & 0x3FF, 0, 0)])
+        done.wait(5.0)
+    finally:
+        w.close()
+
+def bench_shm(rate: float, count: int, poll: float) -> List[float]:
+    name = f'eog_bench_{int(time.time())}'
+    ready, done = Event(), Event()
+    proc = Process(target=_shm_writer, args=(name, rate, count, ready, done), daemon=True)
+    proc.start()
+    ready.wait(5.0)
+    reader = EogShmReader(name)
+    lat: List[float] = []
+    received = 0
+    deadline = time.time() + count / rate + 5.0
+    try:
+        while received < count and time.time() < deadline:
+            samples = reader.read()
+            now_ns = time.time_ns()
+            lat.extend((now_ns - sent_ns) / 1e6 for sent_ns, _, _, _ in samples)
+            received += len(samples)
+            time.sleep(poll)
+    finally:
+        reader.close()
+        done.set()
+        proc.join(5.0)
+    if reader.dropped:
+        print(f'shm: dropped {reader.dropped} samples')
+    return lat
+
+def bench_http(server: str, token: str, rate: float, count: int, batch: int) -> List[float]:
+    from websocket import WebSocketApp
+    from eog_http_push import post_json
+
+    u = urlparse(server)
+    ws_url = urlunparse(('wss' if u.scheme == 'https' else 'ws', u.netloc, '/ws',
+                         '', urlencode({'token': token}) if token else '', ''))
+    lat: List[float] = []
+    opened = threading.Event()
+
+    def on_message(_ws, msg):
+        try:
+            obj = json.loads(msg)
+        except Exception:
+            return
+        if obj.get('type') != 'eog':
+            return
+        samples = (obj.get('payload') or {}).get('samples') or []
+        now_ms = time.time() * 1000
+        lat.extend(now_ms - smp['epoch_ms'] for smp in samples)
+
+    ws = WebSocketApp(ws_url, on_open=lambda _ws: opened.set(), on_message=on_message)
+    t = threading.Thread(target=ws.run_forever, daemon=True)
+    t.start()
+    if not opened.wait(5.0):
+        print(f'http: could not connect to {ws_url}')
+        return lat
+    url = server.rstrip('/') + '/api/eog/push'
+    period = batch / rate
+    try:
+        for i in range(0, count, batch):
+            t0 = time.perf_counter()
+            now_ms = time.time() * 1000
+            samples = [{'epoch_ms': now_ms, 'raw': j & 0x3FF, 'lop': 0, 'lon': 0} for j in range(i, min(i + batch, count))]
+            try:
+                post_json(url, {'aref': 3.3, 'samples': samples}, token=token)
+            except Exception as e:
+                print('http: POST error:', e)
+                break
+            time.sleep(max(0.0, period - (time.perf_counter() - t0)))
+        time.sleep(1.0)  # let the last broadcasts arrive
+    finally:
+        ws.close()
+    return lat
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark EOG shared-memory vs HTTP/WebSocket latency')
+    ap.add_argument('--path', choices=('shm', 'http', 'both'), default='both')
+    ap.add_argument('--server', type=str, default='http://localhost:3000')
+    ap.add_argument('--token', type=str, default='')
+    ap.add_argument('--rate', type=float, default=250.0, help='samples per second')
+    ap.add_argument('--seconds', type=float, default=10.0)
+    ap.add_argument('--batch', type=int, default=40, help='samples per POST (http path)')
+    ap.add_argument('--poll', type=float, default=0.0005, help='reader poll interval in s (shm path)')
+    args = ap.parse_args()
+    count = int(args.rate * args.seconds)
+
+    if args.path in ('shm', 'both'):
+        summarize('shm ', bench_shm(args.rate, count, args.poll))
+    if args.path in ('http', 'both'):
+        summarize('http', bench_http(args.server, args.token, args.rate, count, args.batch))
+        # The real pusher also holds each sample until its batch fills
+        print(f'http: + batching delay up to {args.batch / args.rate * 1000:.0f}ms per sample at --batch {args.batch}')
+
+if __name__ == '__main__':
+    main()
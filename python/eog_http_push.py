@@ -19,23 +19,58 @@ Reads CSV lines: millis,raw,lop,lon from a serial port and batches them to
   POST /api/eog/push  (JSON)
 on the dashboard server. The server broadcasts them over WebSocket as type "eog".
 
+Optionally (--shm NAME) every parsed sample is also written into a local
+shared-memory ring buffer (see eog_shm.py), so an analyzer on the same machine
+can read samples without the JSON/HTTP/WebSocket round trip. --no-http turns
+off POSTing when only local consumers are needed.
+
 Usage:
   python eog_http_push.py --server http://localhost:3000 --port /dev/tty.usbmodemXXXX --token YOUR_TOKEN
+  python eog_http_push.py --port /dev/ttyACM0 --shm eog0 --no-http
 
 No external dependencies beyond pyserial.
 """
 from __future__ import annotations
-import argparse, json, sys, time
-from typing import List, Dict, Any
+import argparse, json, struct, sys, time
+from typing import List, Dict, Any, Tuple
 import serial
 from serial.tools import list_ports
 from urllib.request import Request, urlopen
+from eog_shm import EogShmWriter, DEFAULT_CAPACITY
 
-def auto_detect_port() -> str | None:
+def detect_ports() -> List[str]:
+    """All serial ports that look like an Arduino / USB-serial board."""
     ports = list(list_ports.comports())
-    cand = [p.device for p in ports if any(k in (p.description or '').lower() for k in ('arduino','wch','usb serial'))
+    return [p.device for p in ports if any(k in (p.description or '').lower() for k in ('arduino','wch','usb serial'))
             or any(k in (p.device or '').lower() for k in ('usbmodem','usbserial','ttyacm','ttyusb'))]
-    return cand[0] if cand else (ports[0].device if ports else None)
+
+def auto_detect_port() -> str | None:
+    cand = detect_ports()
+    if cand:
+        return cand[0]
+    ports = list(list_ports.comports())
+    return ports[0].device if ports else None
+
+def parse_line(line: bytes) -> Tuple[int, int, int, int] | None:
+    """Parse one CSV line into (millis, raw, lop, lon); None if malformed.
+
+    Out-of-range fields (e.g. two lines glued together after a lost newline)
+    count as malformed.
+    """
+    try:
+        parts = line.decode('utf-8', errors='ignore').strip().split(',')
+        if len(parts) < 2:
+            return None
+        ms = int(parts[0])
+        raw = int(parts[1])
+        # tolerate 2–4 columns: ms,raw[,lop[,lon]]
+        lop = int(parts[2]) if len(parts) >= 3 and parts[2] != '' else 0
+        lon = int(parts[3]) if len(parts) >= 4 and parts[3] != '' else 0
+        if ms < 0 or not -2**31 <= raw < 2**31 or not 0 <= lop <= 255 or not 0 <= lon <= 255:
+            return None
+        return ms, raw, lop, lon
+    except ValueError:
+        return None
 
 def post_json(url: str, body: Dict[str, Any], token: str = '') -> Dict[str, Any]:
     data = json.dumps(body).encode('utf-8')
@@ -59,18 +94,50 @@ def main():
     ap.add_argument('--batch', type=int, default=40, help='samples per POST')
     ap.add_argument('--token', type=str, default='', help='API_AUTH_TOKEN if server requires it')
     ap.add_argument('--verbose', action='store_true', help='print POST results and basic stats')
+    ap.add_argument('--shm', type=str, default='', help='also write samples to this shared-memory ring (local consumers)')
+    ap.add_argument('--shm-capacity', type=int, default=DEFAULT_CAPACITY, help='ring size in samples')
+    ap.add_argument('--no-http', action='store_true', help='do not POST to the server (use with --shm)')
     args = ap.parse_args()
+    if args.no_http and not args.shm:
+        print('--no-http requires --shm')
+        sys.exit(2)
+
+    shm = None
+    if args.shm:
+        try:
+            shm = EogShmWriter(args.shm, capacity=args.shm_capacity, aref=args.aref)
+        except FileExistsError as e:
+            print(e)
+            sys.exit(2)
+        print(f'Writing samples to shared memory {args.shm!r} ({args.shm_capacity} slots)')
 
     port = args.port or auto_detect_port()
     if not port:
         print('No serial port found. Use --port')
         sys.exit(2)
     print(f'Using serial {port} @ {args.baud} baud, aref={args.aref}')
-    ser = serial.Serial(port, args.baud, timeout=0.1)
+    try:
+        ser = serial.Serial(port, args.baud, timeout=0.1)
+    except Exception:
+        if shm is not None:
+            shm.close()
+        raise
     time.sleep(1.2)  # Arduino auto reset wait
 
     url = args.server.rstrip('/') + '/api/eog/push'
     buf: List[Dict[str, Any]] = []
+
+    def flush():
+        nonlocal last_post
+        try:
+            r = post_json(url, { 'aref': args.aref, 'samples': buf }, token=args.token)
+            if args.verbose:
+                print(f'POST ok: {r}')
+        except Exception as e:
+            print('POST error:', e)
+        buf.clear()
+        last_post = time.time()
+
     # Align sample timestamps to device millis to keep spacing stable (like Web Serial implementation)
     ms0 = None  # first seen device millis
     epoch0 = None  # wall-clock epoch (ms) aligned to ms0
@@ -81,25 +148,13 @@ def main():
             if not line:
                 # Flush periodically even without new samples
                 if buf and (time.time() - last_post) > 0.25:
-                    try:
-                        r = post_json(url, { 'aref': args.aref, 'samples': buf }, token=args.token)
-                        if args.verbose:
-                            print(f'POST ok: {r}')
-                    except Exception as e:
-                        print('POST error:', e)
-                    buf.clear()
-                    last_post = time.time()
+                    flush()
                 continue
             try:
-                s = line.decode('utf-8', errors='ignore').strip()
-                parts = s.split(',')
-                if len(parts) < 2:
+                parsed = parse_line(line)
+                if parsed is None:
                     continue
-                ms = int(parts[0])
-                raw = int(parts[1])
-                # tolerate 2–4 columns: ms,raw[,lop[,lon]]
-                lop = int(parts[2]) if len(parts) >= 3 and parts[2] != '' else 0
-                lon = int(parts[3]) if len(parts) >= 4 and parts[3] != '' else 0
+                ms, raw, lop, lon = parsed
 
                 # Initialize alignment anchors on first valid sample
                 now_ms = int(time.time() * 1000)
@@ -109,16 +164,18 @@ def main():
                 # Align incoming millis to wall clock to produce epoch_ms
                 epoch_ms = epoch0 + (ms - ms0)
 
+                # Local consumers get each sample immediately (no batching delay);
+                # a value the ring can't hold must not cost the HTTP path the sample
+                if shm is not None:
+                    try:
+                        shm.write([(epoch_ms, raw, lop, lon)])
+                    except struct.error:
+                        pass
+                if args.no_http:
+                    continue
                 buf.append({ 'epoch_ms': epoch_ms, 'raw': raw, 'lop': lop, 'lon': lon })
                 if len(buf) >= args.batch:
-                    try:
-                        r = post_json(url, { 'aref': args.aref, 'samples': buf }, token=args.token)
-                        if args.verbose:
-                            print(f'POST ok: {r}')
-                    except Exception as e:
-                        print('POST error:', e)
-                    buf.clear()
-                    last_post = time.time()
+                    flush()
             except Exception:
                 # ignore parse errors
                 continue
@@ -127,6 +184,8 @@ def main():
     finally:
         try: ser.close()
         except: pass
+        if shm is not None:
+            shm.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Shared-memory ring buffer for EOG samples (local zero-copy transport).
+
+When the pusher (eog_http_push.py) and an analyzer run on the same machine,
+the pusher can write parsed samples into a named shared-memory block instead
+of (or in addition to) POSTing them to the server. Local consumers attach to
+the block by name and read new samples straight out of the mapped buffer.
+
+Layout (little-endian):
+  header (64 bytes):
+    magic      4s   b'EOG1'
+    version    u32
+    capacity   u32  number of sample slots
+    rec_size   u32  bytes per sample slot
+    aref       f64  ADC reference voltage
+    seq        u64  total samples published (read cursor limit)
+    commit_ns  u64  wall-clock time.time_ns() of the last commit
+    wseq       u64  seq the writer is currently writing up to
+    generation u64  time.time_ns() when the current writer took the block
+    pid        u32  writer process id
+    flags      u32  1 while the writer is open, 0 once it closed the block
+  slots (capacity * 16 bytes):
+    epoch_ms   i64
+    raw        i32
+    lop        u8
+    lon        u8
+    (2 bytes padding)
+
+Single writer, any number of readers. A write is seqlock-style: the writer
+first publishes `wseq` (how far it is about to write), then fills the slots,
+then publishes `seq`. Readers only read up to `seq`, and after reading they
+compare against `wseq` to drop the oldest records the writer may have been
+overwriting meanwhile, so a torn record is never returned by read().
+
+A second writer for a name that is still owned by a live process raises
+FileExistsError; a block left behind by a crashed writer is taken over and
+continues its sequence. When the writer closes the block or its process dies,
+readers notice (closed flag / dead pid) and reattach by name as soon as a new
+writer creates a block.
+
+Usage (reader):
+  python eog_shm.py --name eog0            # print new samples as they arrive
+
+No external dependencies (standard library only; numpy for read_arrays()).
+"""
+from __future__ import annotations
+import argparse, os, struct, sys, time
+from multiprocessing import shared_memory
+from typing import Any, Iterator, List, Tuple
+
+MAGIC = b'EOG1'
+VERSION = 2
+HEADER = struct.Struct('<4sIIIdQQQQII')
+HEADER_SIZE = 64
+SEQ_OFFSET = 24
+COMMIT_OFFSET = 32
+WSEQ_OFFSET = 40
+GEN_OFFSET = 48
+PID_OFFSET = 56
+FLAGS_OFFSET = 60
+FLAG_OPEN = 1
+_U64 = struct.Struct('<Q')
+_U32 = struct.Struct('<I')
+RECORD = struct.Struct('<qiBB2x')
+DEFAULT_NAME = 'eog0'
+DEFAULT_CAPACITY = 1 << 14  # ~65 s at 250 Hz
+
+Sample = Tuple[int, int, int, int]  # (epoch_ms, raw, lop, lon)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Readers must not unlink the block on exit (only the writer owns it)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *a, **k: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # Windows frees the block once every handle is gone, so a block that
+        # still exists is in use; os.kill(pid, 0) would also signal it there.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _writer_gone(buf: memoryview) -> bool:
+    """Writer closed the block, or its process died without closing it."""
+    if not _U32.unpack_from(buf, FLAGS_OFFSET)[0] & FLAG_OPEN:
+        return True
+    return not _pid_alive(_U32.unpack_from(buf, PID_OFFSET)[0])
+
+
+def record_dtype() -> Any:
+    """numpy structured dtype matching one slot (requires numpy)."""
+    import numpy as np
+    return np.dtype([('epoch_ms', '<i8'), ('raw', '<i4'), ('lop', 'u1'), ('lon', 'u1'), ('_pad', 'V2')])
+
+
+class EogShmWriter:
+    """Producer side: owns the shared-memory block and appends samples."""
+
+    def __init__(self, name: str = DEFAULT_NAME, capacity: int = DEFAULT_CAPACITY, aref: float = 3.3):
+        size = HEADER_SIZE + capacity * RECORD.size
+        self.name = name
+        self.capacity = capacity
+        self.seq = 0
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self.shm = self._reclaim(name, capacity)
+        self._slots = self.shm.buf[HEADER_SIZE:HEADER_SIZE + capacity * RECORD.size]
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, capacity, RECORD.size, aref,
+                         self.seq, time.time_ns(), self.seq, time.time_ns(), os.getpid(), FLAG_OPEN)
+
+    def _reclaim(self, name: str, capacity: int) -> shared_memory.SharedMemory:
+        """Take over a block left behind by a crashed writer, or raise."""
+        old = _attach(name)
+        try:
+            magic, version, old_cap, rec_size, _, seq, _, _, _, pid, flags = HEADER.unpack_from(old.buf, 0)
+        finally:
+            old.close()
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            raise FileExistsError(f'shared memory {name!r} exists and is not an EOG ring')
+        if flags & FLAG_OPEN and _pid_alive(pid):
+            raise FileExistsError(f'shared memory {name!r} is in use by writer pid {pid}')
+        if old_cap != capacity:
+            raise FileExistsError(f'stale shared memory {name!r} has capacity {old_cap}, not {capacity}; remove it first')
+        # Continue the old sequence so readers still attached keep their cursor
+        self.seq = seq
+        return shared_memory.SharedMemory(name=name)
+
+    def write(self, samples: List[Sample]) -> None:
+        """Append samples and publish them with a single seq update."""
+        if not samples:
+            return
+        # Only the newest `capacity` fit; skipped ones still count towards seq
+        skipped = max(0, len(samples) - self.capacity)
+        samples = samples[skipped:]
+        # Pack first: a bad sample raises struct.error before anything is announced
+        data = b''.join(RECORD.pack(*smp) for smp in samples)
+        self.seq += skipped
+        _U64.pack_into(self.shm.buf, WSEQ_OFFSET, self.seq + len(samples))
+        a = (self.seq % self.capacity) * RECORD.size
+        head = min(len(data), len(self._slots) - a)
+        self._slots[a:a + head] = data[:head]
+        if head < len(data):
+            self._slots[:len(data) - head] = data[head:]
+        self.seq += len(samples)
+        _U64.pack_into(self.shm.buf, COMMIT_OFFSET, time.time_ns())
+        _U64.pack_into(self.shm.buf, SEQ_OFFSET, self.seq)
+
+    def close(self) -> None:
+        """Mark the block closed (readers reattach to the next writer) and unlink it."""
+        _U32.pack_into(self.shm.buf, FLAGS_OFFSET, 0)
+        self._slots.release()
+        self.shm.close()
+        try: self.shm.unlink()
+        except FileNotFoundError: pass
+
+
+class EogShmReader:
+    """Consumer side: attaches to an existing block and yields new samples.
+
+    A fresh reader starts at the current write cursor (only new samples).
+    `dropped` counts samples that were overwritten before they could be read.
+    If the writer closes the block, the reader reattaches to the next block
+    created under the same name and reads it from the start.
+
+    read() copies records into tuples. For zero-copy access use read_views()
+    (memoryview spans over the mapped slots) or read_arrays() (numpy views),
+    then call overwritten() once done to learn how many leading records were
+    overwritten by the writer while you were using them. Views must be
+    released before close().
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self.name = name
+        self.dropped = 0
+        self._load(_attach(name))
+        self.cursor = self.seq
+        self._last = (self.cursor, self.cursor)
+
+    def _load(self, shm: shared_memory.SharedMemory) -> None:
+        magic, version, capacity, rec_size, aref, _, _, _, generation, _, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            shm.close()
+            raise ValueError(f'shared memory {self.name!r} is not an EOG ring (magic={magic!r}, version={version})')
+        self.shm = shm
+        self.capacity = capacity
+        self.aref = aref
+        self.generation = generation
+        self._slots = shm.buf[HEADER_SIZE:HEADER_SIZE + capacity * RECORD.size]
+
+    @property
+    def seq(self) -> int:
+        return _U64.unpack_from(self.shm.buf, SEQ_OFFSET)[0]
+
+    @property
+    def commit_ns(self) -> int:
+        return _U64.unpack_from(self.shm.buf, COMMIT_OFFSET)[0]
+
+    @property
+    def orphaned(self) -> bool:
+        """True while the writer is gone (closed, or its process died)."""
+        return _writer_gone(self.shm.buf)
+
+    def _reattach(self) -> None:
+        """Follow the writer: a takeover of our block keeps the cursor, while a
+        new block under the same name (after close or crash) is read from 0."""
+        generation = _U64.unpack_from(self.shm.buf, GEN_OFFSET)[0]
+        if generation != self.generation:
+            # A new writer took over this very block and continues its sequence
+            self.generation = generation
+        if not _writer_gone(self.shm.buf):
+            return
+        try:
+            shm = _attach(self.name)
+        except FileNotFoundError:
+            return
+        if _U64.unpack_from(shm.buf, GEN_OFFSET)[0] == self.generation or _writer_gone(shm.buf):
+            shm.close()  # still our block (not unlinked yet), or no live writer yet
+            return
+        old = self.shm
+        self._slots.release()
+        try:
+            self._load(shm)
+        except ValueError:
+            self._slots = old.buf[HEADER_SIZE:HEADER_SIZE + self.capacity * RECORD.size]
+            return
+        try: old.close()
+        except BufferError: pass  # caller still holds views; freed with them
+        self.cursor = 0
+        self._last = (0, 0)
+
+    def _spans(self, start: int, end: int) -> Iterator[memoryview]:
+        a = (start % self.capacity) * RECORD.size
+        b = (end % self.capacity) * RECORD.size
+        if end - start == 0:
+            return
+        if a < b:
+            yield self._slots[a:b]
+        else:
+            yield self._slots[a:]
+            if b:
+                yield self._slots[:b]
+
+    def read_views(self) -> List[memoryview]:
+        """Zero-copy: memoryview spans over records published since the last read."""
+        self._reattach()
+        seq = self.seq
+        if seq < self.cursor:
+            # Sequence went backwards (block recreated outside EogShmWriter); resync
+            self.cursor = seq
+        start = max(self.cursor, seq - self.capacity)
+        self.dropped += start - self.cursor
+        self.cursor = seq
+        self._last = (start, seq)
+        return list(self._spans(start, seq))
+
+    def read_arrays(self) -> List[Any]:
+        """Like read_views(), as numpy structured arrays (see record_dtype())."""
+        import numpy as np
+        dtype = record_dtype()
+        return [np.frombuffer(span, dtype=dtype) for span in self.read_views()]
+
+    def overwritten(self) -> int:
+        """Leading records of the last read_views()/read_arrays() the writer has
+        overwritten (or may be overwriting) since; discard that many."""
+        start, end = self._last
+        wseq = _U64.unpack_from(self.shm.buf, WSEQ_OFFSET)[0]
+        return max(0, min(end - start, wseq - self.capacity - start))
+
+    def read(self) -> List[Sample]:
+        """Return all samples published since the last call (oldest first)."""
+        out: List[Sample] = []
+        for span in self.read_views():
+            out.extend(RECORD.iter_unpack(span))
+            span.release()
+        # Anything the writer overwrote (or started to) while we unpacked is torn
+        lapped = self.overwritten()
+        if lapped:
+            del out[:lapped]
+            self.dropped += lapped
+        return out
+
+    def close(self) -> None:
+        self._slots.release()
+        self.shm.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Tail samples from an EOG shared-memory ring')
+    ap.add_argument('--name', type=str, default=DEFAULT_NAME, help='shared memory block name (pusher --shm)')
+    ap.add_argument('--interval', type=float, default=0.01, help='poll interval (s)')
+    args = ap.parse_args()
+
+    try:
+        reader = EogShmReader(args.name)
+    except FileNotFoundError:
+        print(f'No shared memory block {args.name!r}. Start eog_http_push.py with --shm {args.name}')
+        sys.exit(2)
+    print(f'Attached to {args.name!r}: capacity={reader.capacity}, aref={reader.aref}')
+    waiting = False
+    try:
+        while True:
+            for ms, raw, lop, lon in reader.read():
+                print(f'{ms},{raw},{lop},{lon}')
+            if reader.orphaned != waiting:
+                waiting = not waiting
+                print('writer gone; waiting for it to come back' if waiting else 'writer back', file=sys.stderr)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+        if reader.dropped:
+            print(f'dropped {reader.dropped} samples (reader too slow)', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
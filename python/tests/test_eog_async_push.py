@@ -0,0 +1,148 @@
+"""eog_async_push: stats, ids, Device.run and the supervise loop (serial mocked).
+
+Run: python -m unittest discover -s python/tests
+"""
+import argparse, asyncio, os, sys, unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import serial
+import eog_async_push as eap
+from eog_http_push import parse_line
+
+def make_args(**kw):
+    args = dict(shm='', shm_capacity=64, aref=3.3, baud=115200, batch=40, no_http=True,
+                server='http://localhost:3000', token='', concurrency=2, scan_interval=0.01, stats_interval=0)
+    args.update(kw)
+    return argparse.Namespace(**args)
+
+def comport(device, serial_number=None, location=None):
+    return SimpleNamespace(device=device, serial_number=serial_number, location=location,
+                           description='Arduino Uno')
+
+class FakeSerial:
+    """Returns the given lines, then fails like an unplugged board."""
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self.closed = False
+
+    def readline(self):
+        if not self.lines:
+            raise serial.SerialException('device disconnected')
+        return self.lines.pop(0)
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class ParseLineTest(unittest.TestCase):
+    def test_columns(self):
+        self.assertEqual(parse_line(b'1000,512\r\n'), (1000, 512, 0, 0))
+        self.assertEqual(parse_line(b'1000,512,1,0\n'), (1000, 512, 1, 0))
+        self.assertIsNone(parse_line(b'hello\n'))
+
+    def test_glued_lines_are_rejected(self):
+        self.assertIsNone(parse_line(b'1000,512,0,01004,510,0,0\n'))
+        self.assertIsNone(parse_line(b'1000,99999999999,0,0\n'))
+
+class DeviceStatsTest(unittest.TestCase):
+    def test_mean_std_and_window_reset(self):
+        st = eap.DeviceStats()
+        for ms, lag in ((0, 1), (4, 3), (8, 1), (16, 3)):
+            st.add(ms, 1000 + ms, 1000 + ms + lag)
+        snap = st.snapshot()
+        self.assertAlmostEqual(snap['interval_ms'], 16 / 3)
+        self.assertAlmostEqual(snap['interval_std_ms'], (32 / 9) ** 0.5)
+        self.assertAlmostEqual(snap['lag_ms'], 2.0)
+        self.assertAlmostEqual(snap['lag_std_ms'], 1.0)
+        self.assertEqual(snap['samples'], 4)
+        # Window restarts, but the next interval still joins the previous sample
+        st.add(20, 1020, 1020)
+        snap = st.snapshot()
+        self.assertEqual(snap['interval_ms'], 4)
+        self.assertEqual(snap['samples'], 5)
+
+    def test_new_session_skips_interval_across_sessions(self):
+        st = eap.DeviceStats()
+        st.add(50000, 0, 0)
+        st.new_session()
+        st.add(3, 0, 0)
+        st.add(7, 0, 0)
+        self.assertEqual(st.snapshot()['interval_ms'], 4)
+
+class IdTest(unittest.TestCase):
+    def test_parse_port_spec_and_clean_id(self):
+        self.assertEqual(eap.parse_port_spec('/dev/ttyACM0=left'), ('/dev/ttyACM0', 'left'))
+        self.assertEqual(eap.parse_port_spec('/dev/ttyACM0'), ('/dev/ttyACM0', 'ttyACM0'))
+        self.assertEqual(eap.parse_port_spec('COM3=subj 1/L'), ('COM3', 'subj_1_L'))
+        self.assertEqual(eap.clean_id('1-1.2:1.0'), '1-1.2_1.0')
+
+    def _detect(self, ports):
+        with mock.patch.object(eap, 'detect_ports', return_value=[p.device for p in ports]), \
+             mock.patch.object(eap.list_ports, 'comports', return_value=ports):
+            return eap.detect_boards()
+
+    def test_serial_number_is_preferred(self):
+        boards = self._detect([comport('/dev/ttyACM1', '7573530303', '1-1.2'), comport('/dev/ttyACM0', None, '1-1.3')])
+        self.assertEqual(boards, {'7573530303': '/dev/ttyACM1', '1-1.3': '/dev/ttyACM0'})
+
+    def test_shared_serial_ids_do_not_depend_on_order(self):
+        a = comport('/dev/ttyUSB0', 'CLONE', '1-1.2')
+        b = comport('/dev/ttyUSB1', 'CLONE', '1-1.3')
+        expected = {'CLONE_1-1.2': '/dev/ttyUSB0', 'CLONE_1-1.3': '/dev/ttyUSB1'}
+        self.assertEqual(self._detect([a, b]), expected)
+        self.assertEqual(self._detect([b, a]), expected)
+
+class DeviceRunTest(unittest.TestCase):
+    def test_reads_aligns_and_counts_until_unplugged(self):
+        lines = [b'1000,500,0,0\n', b'1004,501,0,0\n', b'garbage\n', b'1000,512,0,01004,510,0,0\n',
+                 b'', b'5,502,0,0\n', b'9,503,0,0\n']  # board reset after the glued line
+        fake = FakeSerial(lines)
+        dev = eap.Device('/dev/ttyACM0', 'left', make_args(), None)
+        with mock.patch.object(eap, 'RESET_WAIT', 0), \
+             mock.patch.object(eap.serial, 'Serial', return_value=fake):
+            with self.assertRaises(serial.SerialException):
+                asyncio.run(dev.run())
+        dev.close()
+        snap = dev.stats.snapshot()
+        self.assertTrue(fake.closed)
+        self.assertEqual(snap['samples'], 4)
+        self.assertEqual(snap['parse_errors'], 2)
+        self.assertEqual((snap['interval_ms'], snap['interval_std_ms']), (4, 0))
+
+class SuperviseTest(unittest.TestCase):
+    def test_restarts_board_that_moved_port(self):
+        scans = [{'SN1': '/dev/ttyACM0'}] * 3 + [{'SN1': '/dev/ttyACM1'}] * 100
+        started, cancelled = [], []
+
+        async def fake_run(dev):
+            port = dev.port  # like Device.run, which holds the port it opened
+            started.append(port)
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(port)
+                raise
+
+        async def scenario():
+            task = asyncio.create_task(eap.run(make_args(), {}))
+            for _ in range(200):  # until the move has been picked up
+                if len(started) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with mock.patch.object(eap, 'detect_boards', side_effect=scans), \
+             mock.patch.object(eap.Device, 'run', fake_run), \
+             mock.patch('builtins.print'):
+            asyncio.run(scenario())
+        self.assertEqual(started, ['/dev/ttyACM0', '/dev/ttyACM1'])
+        self.assertEqual(cancelled, ['/dev/ttyACM0', '/dev/ttyACM1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""Ring-buffer behaviour of eog_shm (writer and reader in one process).
+
+Run: python -m unittest discover -s python/tests
+"""
+import os, struct, subprocess, sys, time, unittest
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, HERE)
+from eog_shm import EogShmReader, EogShmWriter, PID_OFFSET, WSEQ_OFFSET, _U32, _U64, _attach
+
+WRITER_SCRIPT = """
+import sys, time
+from eog_shm import EogShmWriter
+w = EogShmWriter(sys.argv[1], capacity=8)
+w.write([(1, 2, 0, 0)])
+print('ready', flush=True)
+time.sleep(60)
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def samples(lo, hi):
+    return [(i, i * 10, i & 1, 0) for i in range(lo, hi)]
+
+class EogShmTest(unittest.TestCase):
+    def setUp(self):
+        self.name = f'eog_test_{os.getpid()}_{self._testMethodName}'
+        self.writer = EogShmWriter(self.name, capacity=8)
+        self.reader = EogShmReader(self.name)
+
+    def tearDown(self):
+        self.reader.close()
+        try: self.writer.close()
+        except (FileNotFoundError, ValueError): pass
+
+    def test_reads_only_new_samples(self):
+        self.writer.write(samples(0, 3))
+        self.assertEqual(self.reader.read(), samples(0, 3))
+        self.assertEqual(self.reader.read(), [])
+
+    def test_wraparound(self):
+        self.writer.write(samples(0, 6))
+        self.reader.read()
+        self.writer.write(samples(6, 12))  # slots 6,7 then 0..3
+        self.assertEqual(self.reader.read(), samples(6, 12))
+        self.assertEqual(self.reader.dropped, 0)
+
+    def test_write_larger_than_capacity(self):
+        self.writer.write(samples(0, 20))
+        self.assertEqual(self.writer.seq, 20)
+        self.assertEqual(self.reader.read(), samples(12, 20))
+        self.assertEqual(self.reader.dropped, 12)
+
+    def test_lagging_reader_counts_dropped(self):
+        self.writer.write(samples(0, 5))
+        self.writer.write(samples(5, 15))
+        self.assertEqual(self.reader.read(), samples(7, 15))
+        self.assertEqual(self.reader.dropped, 7)
+
+    def test_drops_slots_of_write_in_progress(self):
+        self.writer.write(samples(0, 8))
+        # Writer announced 3 more samples and may be overwriting slots 0..2
+        _U64.pack_into(self.writer.shm.buf, WSEQ_OFFSET, 11)
+        self.assertEqual(self.reader.read(), samples(3, 8))
+        self.assertEqual(self.reader.dropped, 3)
+
+    def test_rejected_write_announces_nothing(self):
+        self.writer.write(samples(0, 8))
+        with self.assertRaises(struct.error):
+            self.writer.write([(8, 80, 0, 1004)])  # lon does not fit in u8
+        self.assertEqual(_U64.unpack_from(self.writer.shm.buf, WSEQ_OFFSET)[0], 8)
+        self.assertEqual(self.reader.read(), samples(0, 8))
+        self.assertEqual(self.reader.dropped, 0)
+
+    def test_views_and_overwritten(self):
+        self.writer.write(samples(0, 6))
+        self.reader.read()
+        self.writer.write(samples(6, 10))
+        views = self.reader.read_views()
+        self.assertEqual([len(v) for v in views], [32, 32])
+        self.assertEqual(self.reader.overwritten(), 0)
+        self.writer.write(samples(10, 16))  # records 14, 15 land on 6, 7
+        self.assertEqual(self.reader.overwritten(), 2)
+        for v in views:
+            v.release()
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_read_arrays(self):
+        self.writer.write(samples(0, 3))
+        (arr,) = self.reader.read_arrays()
+        self.assertEqual(arr['raw'].tolist(), [0, 10, 20])
+        del arr
+
+    def test_second_live_writer_is_rejected(self):
+        with self.assertRaises(FileExistsError):
+            EogShmWriter(self.name, capacity=8)
+        self.writer.write(samples(0, 2))
+        self.assertEqual(self.reader.read(), samples(0, 2))
+
+    def test_reclaims_block_of_dead_writer(self):
+        # Block still present after the writer died (e.g. no resource tracker)
+        self.writer.write(samples(0, 4))
+        self.reader.read()
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        _U32.pack_into(self.writer.shm.buf, PID_OFFSET, dead.pid)
+        crashed, self.writer = self.writer, EogShmWriter(self.name, capacity=8)
+        crashed._slots.release()
+        crashed.shm.close()
+        self.assertEqual(self.writer.seq, 4)
+        self.writer.write(samples(4, 6))
+        self.assertEqual(self.reader.read(), samples(4, 6))
+
+    def test_reader_follows_restarted_writer(self):
+        self.writer.write(samples(0, 2))
+        self.reader.read()
+        self.writer.close()
+        self.assertTrue(self.reader.orphaned)
+        self.assertEqual(self.reader.read(), [])
+        self.writer = EogShmWriter(self.name, capacity=8)
+        self.writer.write(samples(100, 103))
+        self.assertEqual(self.reader.read(), samples(100, 103))
+        self.assertFalse(self.reader.orphaned)
+
+    @unittest.skipIf(os.name == 'nt', 'POSIX: a killed writer leaves its block to the resource tracker')
+    def test_reader_recovers_from_killed_writer(self):
+        name = self.name + '_killed'
+        child = subprocess.Popen([sys.executable, '-c', WRITER_SCRIPT, name],
+                                 cwd=HERE, stdout=subprocess.PIPE, text=True)
+        self.assertEqual(child.stdout.readline().strip(), 'ready')
+        reader = EogShmReader(name)
+        child.kill()
+        child.wait()
+        child.stdout.close()
+        self.assertTrue(reader.orphaned)
+        # Give the child's resource tracker a moment to unlink the block
+        deadline = time.time() + 2
+        while time.time() < deadline:
+            try:
+                _attach(name).close()
+            except FileNotFoundError:
+                break
+            time.sleep(0.05)
+        writer = EogShmWriter(name, capacity=8)
+        try:
+            writer.write(samples(0, 3))
+            self.assertEqual(reader.read(), samples(0, 3))
+            self.assertFalse(reader.orphaned)
+        finally:
+            reader.close()
+            writer.close()
+
+if __name__ == '__main__':
+    unittest.main()